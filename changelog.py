@@ -0,0 +1,92 @@
+"""Retenção do log de alterações (SIGAA_CHANGE_LOG, feed ``/_changes``).
+
+O log é definido em ``sql/SIGAA-Changes.sql``. Registros mais antigos que
+``CHANGE_LOG_RETENTION_DAYS`` dias são descartados por
+``SIGAA_PRUNE_CHANGE_LOG``, que também avança o horizonte do log: clientes com
+uma continuação anterior a ele recebem ``410`` e precisam ressincronizar pelas
+listagens.
+
+`ChangeLogPruner` faz o descarte periodicamente no processo da API, a cada
+``CHANGE_LOG_PRUNE_INTERVAL`` segundos. Com vários workers, um advisory lock
+garante que apenas um deles descarte por vez.
+
+Também pode ser executado manualmente (ex.: via cron):
+
+    python changelog.py
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+import loader
+
+logger = logging.getLogger(__name__)
+
+# Chave arbitrária do advisory lock que serializa os descartes entre processos
+_ADVISORY_LOCK_KEY = 310031
+
+CHANGE_LOG_RETENTION_DAYS = float(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+CHANGE_LOG_PRUNE_INTERVAL = float(os.getenv("CHANGE_LOG_PRUNE_INTERVAL", "3600"))
+
+
+def prune(engine: Engine, retention_days: float = CHANGE_LOG_RETENTION_DAYS) -> Optional[int]:
+    """Descarta registros antigos; retorna quantos, ou None se outro processo já descarta."""
+    with engine.begin() as conn:
+        if conn.execute(text("select to_regclass('sigaa_change_log')")).scalar() is None:
+            return 0
+        locked = conn.execute(
+            text("select pg_try_advisory_xact_lock(:k)"), {"k": _ADVISORY_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            return None
+        return conn.execute(
+            text("select SIGAA_PRUNE_CHANGE_LOG(make_interval(secs => :s))"),
+            {"s": retention_days * 86400},
+        ).scalar()
+
+
+class ChangeLogPruner(threading.Thread):
+    """Thread que descarta periodicamente os registros antigos do log."""
+
+    def __init__(self, engine: Engine, interval: float = CHANGE_LOG_PRUNE_INTERVAL,
+                 retention_days: float = CHANGE_LOG_RETENTION_DAYS) -> None:
+        super().__init__(name="change-log-pruner", daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self.retention_days = retention_days
+        self.pruned = 0
+        self.last_prune: Optional[float] = None
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                removed = prune(self.engine, self.retention_days)
+                if removed is not None:
+                    self.pruned += removed
+                    self.last_prune = time.time()
+            except Exception:
+                logger.exception("falha no descarte do log de alterações")
+            self._stop_event.wait(self.interval)
+
+    def stats(self) -> dict:
+        return {"pruned": self.pruned, "lastPrune": self.last_prune}
+
+
+if __name__ == "__main__":
+    removed = prune(create_engine(loader.DATABASE_URL))
+    if removed is None:
+        print("descarte já em andamento em outro processo", file=sys.stderr)
+        sys.exit(1)
+    print(f"{removed} registros descartados")
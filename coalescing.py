@@ -0,0 +1,95 @@
+"""Coalescência (single-flight) de requisições idênticas concorrentes.
+
+Quando várias requisições com a mesma rota e os mesmos parâmetros chegam ao
+mesmo tempo, apenas a primeira executa a consulta no banco; as demais aguardam
+o mesmo resultado (ou a mesma exceção) em vez de repetir o trabalho.
+
+A chave é formada pela rota e pelos parâmetros normalizados (valores ``None``
+descartados e nomes ordenados), de modo que ``?a=1&b=2`` e ``?b=2&a=1``
+compartilham a mesma execução.
+
+Não há cache: assim que a execução termina, a chave é liberada e a próxima
+requisição dispara uma nova consulta.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+def make_key(route: str, params: dict) -> Tuple[Hashable, ...]:
+    """Monta a chave de coalescência a partir da rota e dos parâmetros."""
+    items = tuple(sorted((k, str(v)) for k, v in params.items() if v is not None))
+    return (route, items)
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Compartilha uma única execução entre chamadas concorrentes de mesma chave.
+
+    - Exceções da execução são propagadas para todas as chamadas que a aguardam.
+    - O cancelamento de uma chamada (ex.: cliente desconectou) não cancela a
+      execução enquanto ainda houver outras chamadas aguardando; quando a
+      última desiste, a execução compartilhada também é cancelada.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = _Flight(task=asyncio.ensure_future(fn()))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+                # O callback `_finish` só roda depois; até lá, uma nova chamada
+                # com a mesma chave aguardaria esta execução e receberia
+                # CancelledError sem ter sido cancelada.
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            # Lê a exceção para evitar o aviso "exception was never retrieved"
+            # quando todas as chamadas já desistiram.
+            self.errors += 1
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,161 @@
+"""Prazos de execução das consultas e cancelamento no servidor.
+
+Cada rota tem um orçamento de tempo aplicado como ``statement_timeout`` na
+transação da sessão usada pela requisição. Quando o cliente HTTP desconecta, a
+consulta em andamento é cancelada no Postgres (``pg_cancel_backend`` via
+``connection.cancel()`` do psycopg2), liberando a conexão do pool. No backend
+de snapshot a consulta é interrompida com ``sqlite3.Connection.interrupt()``.
+
+As ocorrências são contabilizadas por nome de consulta de `queries.py`
+(``ALUNO_LIST``, ``CURSO_DETAIL``...).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+import queries
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE 57014: query_canceled (statement_timeout ou cancelamento explícito)
+QUERY_CANCELED = "57014"
+
+DEFAULT_STATEMENT_TIMEOUT_MS = int(os.getenv("STATEMENT_TIMEOUT_MS", "5000"))
+
+# Orçamento por rota; rotas ausentes usam DEFAULT_STATEMENT_TIMEOUT_MS
+ROUTE_STATEMENT_TIMEOUT_MS: Dict[str, int] = {
+    "/Aluno": 3000,
+    "/Aluno/{id}": 1000,
+    "/Aluno/_stats": 1000,
+    "/Curso": 2000,
+    "/Curso/{id}": 1000,
+    "/Curso/{id}/_stats": 1000,
+    "/Curriculo": 2000,
+    "/Curriculo/{id}": 1000,
+    "/Curriculo/{id}/disciplina": 2000,
+    "/Curriculo/{id}/disciplina/{disciplina}": 1000,
+    "/_changes": 2000,
+}
+
+# Mapeia o texto SQL de volta para o nome da constante em `queries.py`
+QUERY_NAMES: Dict[str, str] = {
+    sql: name for name, sql in vars(queries).items()
+    if name.isupper() and isinstance(sql, str)
+}
+
+
+def route_timeout_ms(route: str) -> int:
+    return ROUTE_STATEMENT_TIMEOUT_MS.get(route, DEFAULT_STATEMENT_TIMEOUT_MS)
+
+
+def instrument(engine: Engine) -> None:
+    """Registra na conexão o nome da última consulta executada."""
+    @event.listens_for(engine, "before_execute")
+    def _track_query_name(conn, clauseelement, multiparams, params, execution_options):
+        sql = getattr(clauseelement, "text", None)
+        conn.info["query_name"] = QUERY_NAMES.get(sql, "other")
+
+
+def apply_timeout(conn: Connection, timeout_ms: int) -> None:
+    """Aplica `statement_timeout` apenas à transação corrente da conexão.
+
+    Só se aplica ao Postgres; o snapshot SQLite não tem prazo por consulta.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    conn.exec_driver_sql(
+        "select set_config('statement_timeout', %(t)s, true)", {"t": str(int(timeout_ms))}
+    )
+
+
+def is_query_canceled(exc: BaseException) -> bool:
+    if not isinstance(exc, DBAPIError):
+        return False
+    if isinstance(exc.orig, sqlite3.OperationalError):
+        return str(exc.orig) == "interrupted"
+    return getattr(exc.orig, "pgcode", None) == QUERY_CANCELED
+
+
+class QueryCancelled(Exception):
+    """O cancelamento chegou antes de a consulta começar."""
+
+
+def _cancel(dbapi_conn: Any) -> None:
+    # psycopg2 expõe cancel(); sqlite3 (backend de snapshot), interrupt()
+    if hasattr(dbapi_conn, "cancel"):
+        dbapi_conn.cancel()
+    else:
+        dbapi_conn.interrupt()
+
+
+class Canceller:
+    """Permite cancelar, a partir de outra thread, a consulta em andamento.
+
+    A consulta roda no threadpool; quando o cliente desconecta, o event loop
+    chama `cancel_in_background()`, pois o ``cancel()`` do psycopg2 é
+    bloqueante (abre e autentica uma nova conexão com o servidor).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._dbapi_conn: Any = None
+        self.cancelled = False
+
+    def attach(self, dbapi_conn: Any) -> None:
+        """Associa a conexão da consulta; levanta QueryCancelled se já cancelado.
+
+        Cancelar uma conexão ociosa não tem efeito: a consulta seguinte rodaria
+        até o fim para um cliente que já foi embora.
+        """
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled()
+            self._dbapi_conn = dbapi_conn
+
+    def detach(self) -> None:
+        with self._lock:
+            self._dbapi_conn = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            if self._dbapi_conn is not None:
+                _cancel(self._dbapi_conn)
+
+    def cancel_in_background(self) -> None:
+        """Dispara `cancel()` numa thread própria, sem esperar o resultado."""
+        threading.Thread(target=self._cancel_logged, name="query-cancel", daemon=True).start()
+
+    def _cancel_logged(self) -> None:
+        try:
+            self.cancel()
+        except Exception:
+            # O prazo da rota (statement_timeout) ainda encerra a consulta
+            logger.warning("falha ao cancelar a consulta", exc_info=True)
+
+
+class StatementMetrics:
+    """Contadores de consultas canceladas e expiradas por nome de consulta."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"cancelled": 0, "timed_out": 0}
+        )
+
+    def record(self, query_name: Optional[str], outcome: str) -> None:
+        with self._lock:
+            self._counts[query_name or "other"][outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(counts) for name, counts in sorted(self._counts.items())}
@@ -35,6 +35,10 @@ where (unaccent(alu.NOME) ilike '%'||unaccent(:nome)||'%' or :nome is null)
   and (cu.UNIDADE = :unidade or :unidade is null)
   and ((ac.PERIODO_LETIVO_REGISTRO = substring(:periodoIngresso from 1 for 4)||substring(:periodoIngresso from 6))
        or :periodoIngresso is null)
+  and (alu.MATRICULA in (select a.MATRICULA from SIGAA_ALUNO a where a.MODIFICADO_EM >= :modifiedSince
+                          union
+                          select a.ALUNO from SIGAA_RL_ALUNO_CURSO a where a.MODIFICADO_EM >= :modifiedSince)
+       or :modifiedSince is null)
 order by alu.MATRICULA, alu.NOME
 offset :_pageOffset
 limit :_pageSize
@@ -72,7 +76,11 @@ select
 from SIGAA_CURSO cur
 inner join SIGAA_RL_CURSO_UNIDADE rcu on cur.ID = rcu.CURSO 
 where (unaccent(cur.NOME) ilike '%'||unaccent(:nome)||'%' or :nome is null) and
-      (rcu.UNIDADE = :unidade or :unidade is null)
+      (rcu.UNIDADE = :unidade or :unidade is null) and
+      (cur.ID in (select c.ID from SIGAA_CURSO c where c.MODIFICADO_EM >= :modifiedSince
+                  union
+                  select c.CURSO from SIGAA_RL_CURSO_UNIDADE c where c.MODIFICADO_EM >= :modifiedSince)
+       or :modifiedSince is null)
 order by cur.ID, cur.NOME 
 offset :_pageOffset 
 limit :_pageSize
@@ -129,6 +137,10 @@ inner join SIGAA_RL_CURRICULO_CURSO srcc ON ec.ID = srcc.CURRICULO
 inner join SIGAA_CURSO sc ON srcc.CURSO = sc.ID
 where srcc.CURSO = :curso
     and (case when ec.STATUS = 'A' then 'ativo' when ec.STATUS = 'I' then 'inativo' end = :status or :status is null)
+    and (ec.ID in (select c.ID from SIGAA_CURRICULO c where c.MODIFICADO_EM >= :modifiedSince
+                   union
+                   select c.CURRICULO from SIGAA_RL_CURRICULO_CURSO c where c.MODIFICADO_EM >= :modifiedSince)
+         or :modifiedSince is null)
 order by substring(ec.ID from 6)
 offset :_pageOffset 
 limit :_pageSize
@@ -200,3 +212,50 @@ left join SIGAA_UNIDADE u on d.UNIDADE = u.ID
 where cd.CURRICULO = substring(:id from 1 for 4)||'/'||substring(:id from 6)
     and cd.DISCIPLINA = :disciplina
 """
+
+# ---------------- Estatísticas (rollups) ----------------
+# Leitura da materialized view SIGAA_MV_ALUNO_ROLLUP (sql/SIGAA-Rollups.sql).
+# :agrupamento seleciona a combinação de dimensões agregadas (bitmask de
+# GROUPING(CURSO, UNIDADE, PERIODO_LETIVO_REGISTRO)).
+ALUNO_STATS = """
+select
+  r.CURSO,
+  r.UNIDADE,
+  substring(r.PERIODO_LETIVO_REGISTRO from 1 for 4) as PERIODO_INGRESSO_ANO,
+  substring(r.PERIODO_LETIVO_REGISTRO from 5) as PERIODO_INGRESSO_NUMERO,
+  r.TOTAL
+from SIGAA_MV_ALUNO_ROLLUP r
+where r.AGRUPAMENTO = :agrupamento
+  and (r.CURSO = :curso or :curso is null)
+  and (r.UNIDADE = :unidade or :unidade is null)
+  and (r.PERIODO_LETIVO_REGISTRO = substring(:periodoIngresso from 1 for 4)||substring(:periodoIngresso from 6)
+       or :periodoIngresso is null)
+order by r.CURSO, r.UNIDADE, r.PERIODO_LETIVO_REGISTRO
+"""
+
+# ---------------- Alterações ----------------
+# O filtro :modifiedSince das listagens usa subconsultas sobre os índices de
+# MODIFICADO_EM; com o parâmetro nulo o Postgres descarta a subconsulta.
+# Feed de alterações (sql/SIGAA-Changes.sql). Só devolve registros de
+# transações já encerradas (TXID abaixo do xmin do snapshot atual), de modo que
+# a continuação (:sinceTxid, :sinceSeq) nunca salta registros.
+CHANGES_LIST = """
+select
+  cl.TXID,
+  cl.SEQ,
+  cl.RECURSO,
+  cl.RECURSO_ID,
+  cl.OPERACAO
+from SIGAA_CHANGE_LOG cl
+where (cl.TXID, cl.SEQ) > (:sinceTxid, :sinceSeq)
+  and cl.TXID < txid_snapshot_xmin(txid_current_snapshot())
+  and (cl.RECURSO = :recurso or :recurso is null)
+order by cl.TXID, cl.SEQ
+limit :_pageSize
+"""
+
+# Posição até a qual o log já foi descartado; continuações anteriores expiraram
+CHANGES_HORIZON = """
+select h.TXID, h.SEQ
+from SIGAA_CHANGE_LOG_HORIZON h
+"""
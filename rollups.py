@@ -0,0 +1,118 @@
+"""Atualização dos rollups de contagem de alunos (SIGAA_MV_ALUNO_ROLLUP).
+
+A materialized view é definida em ``sql/SIGAA-Rollups.sql``. Ela é atualizada
+com ``REFRESH MATERIALIZED VIEW CONCURRENTLY`` (as leituras continuam sendo
+atendidas durante o refresh):
+
+- quando as tabelas de origem mudam: triggers publicam no canal
+  ``sigaa_rollups`` e `RollupRefresher` faz o refresh assim que possível,
+  respeitando um intervalo mínimo entre refreshes;
+- periodicamente, a cada ``ROLLUP_REFRESH_INTERVAL`` segundos, mesmo sem
+  notificação.
+
+Com vários workers, um advisory lock garante que apenas um deles faça o
+refresh por vez.
+
+Também pode ser executado manualmente (ex.: via cron):
+
+    python rollups.py
+"""
+from __future__ import annotations
+
+import logging
+import os
+import select
+import sys
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+import loader
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "sigaa_rollups"
+MATERIALIZED_VIEWS = ("SIGAA_MV_ALUNO_ROLLUP",)
+# Chave arbitrária do advisory lock que serializa os refreshes entre processos
+_ADVISORY_LOCK_KEY = 290029
+
+ROLLUP_REFRESH_INTERVAL = float(os.getenv("ROLLUP_REFRESH_INTERVAL", "900"))
+ROLLUP_MIN_REFRESH_INTERVAL = float(os.getenv("ROLLUP_MIN_REFRESH_INTERVAL", "30"))
+
+
+def refresh(engine: Engine) -> bool:
+    """Atualiza os rollups; retorna False se outro processo já está atualizando."""
+    with engine.begin() as conn:
+        locked = conn.execute(
+            text("select pg_try_advisory_xact_lock(:k)"), {"k": _ADVISORY_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            return False
+        for view in MATERIALIZED_VIEWS:
+            conn.execute(text(f"refresh materialized view concurrently {view}"))
+    return True
+
+
+class RollupRefresher(threading.Thread):
+    """Thread que escuta `CHANNEL` e atualiza os rollups quando necessário."""
+
+    def __init__(self, engine: Engine, interval: float = ROLLUP_REFRESH_INTERVAL,
+                 min_interval: float = ROLLUP_MIN_REFRESH_INTERVAL) -> None:
+        super().__init__(name="rollup-refresher", daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self.min_interval = min_interval
+        self.refreshes = 0
+        self.last_refresh: Optional[float] = None
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("falha no refresh dos rollups; nova tentativa em %ss", self.min_interval)
+                self._stop_event.wait(self.min_interval)
+
+    def _listen(self) -> None:
+        raw = self.engine.raw_connection()
+        # Lida antes do detach: depois dele `driver_connection` passa a ser None
+        conn = raw.driver_connection
+        # Conexão dedicada (fora do pool): fica em autocommit e com LISTEN ativo
+        raw.detach()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"listen {CHANNEL}")
+            dirty = False
+            last = time.monotonic()
+            while not self._stop_event.is_set():
+                select.select([conn], [], [], 1.0)
+                conn.poll()
+                if conn.notifies:
+                    conn.notifies.clear()
+                    dirty = True
+                elapsed = time.monotonic() - last
+                if (dirty and elapsed >= self.min_interval) or elapsed >= self.interval:
+                    if refresh(self.engine):
+                        self.refreshes += 1
+                        self.last_refresh = time.time()
+                    dirty = False
+                    last = time.monotonic()
+        finally:
+            raw.close()
+
+    def stats(self) -> dict:
+        return {"refreshes": self.refreshes, "lastRefresh": self.last_refresh}
+
+
+if __name__ == "__main__":
+    if not refresh(create_engine(loader.DATABASE_URL)):
+        print("refresh já em andamento em outro processo", file=sys.stderr)
+        sys.exit(1)
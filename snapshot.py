@@ -0,0 +1,317 @@
+"""Snapshot somente leitura do banco SIGAA em um arquivo SQLite.
+
+Permite rodar réplicas da API sem Postgres (ex.: nós de borda nos campi):
+
+1. Exporte o snapshot a partir do Postgres:
+
+    python snapshot.py export /data/sigaa.sqlite
+
+   Todas as tabelas são lidas na mesma transação ``REPEATABLE READ``, de modo
+   que o arquivo reflete um único instante do banco. O arquivo é escrito ao
+   lado do destino e movido com ``os.replace``, portanto a troca é atômica.
+
+2. Suba a API apontando para o arquivo:
+
+    SIGAA_BACKEND=snapshot SNAPSHOT_PATH=/data/sigaa.sqlite uvicorn fastapi_app:app
+
+Cada thread do worker mantém sua própria conexão, aberta em modo somente
+leitura e com I/O mapeado em memória (``mmap_size``). Ao receber uma conexão do
+pool, verifica-se se o arquivo foi substituído; se sim, a conexão é reaberta
+no novo snapshot, sem reiniciar o processo.
+
+As consultas de `queries.py` são traduzidas para o dialeto do SQLite por
+`translate`. As buscas por nome usam colunas ``NOME_UNACCENT`` pré-calculadas
+na exportação.
+
+Os rollups de ``_stats`` só são exportados se existirem no Postgres; sem eles,
+as rotas ``_stats`` respondem 501 no snapshot e as demais funcionam normalmente.
+Da mesma forma, em um banco sem ``sql/SIGAA-Changes.sql`` a coluna
+``MODIFICADO_EM`` é exportada nula: o filtro ``modifiedSince`` não seleciona
+nenhuma linha e as demais consultas não mudam.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+import unicodedata
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine as sa_create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import SingletonThreadPool
+
+import loader
+
+SNAPSHOT_MMAP_SIZE = int(os.getenv("SNAPSHOT_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Uma conexão por thread do threadpool (40 por padrão no Starlette)
+SNAPSHOT_POOL_SIZE = 64
+
+_BATCH_SIZE = 5000
+
+# Tabelas com busca por nome (`unaccent(X.NOME) ilike ...` em queries.py)
+SEARCH_TABLES = ("sigaa_aluno", "sigaa_curso", "sigaa_disciplina")
+# Tabelas do filtro `modifiedSince` (índices IX_*_MODIFICADO_EM no Postgres)
+MODIFIED_TABLES = (
+    "sigaa_aluno", "sigaa_rl_aluno_curso", "sigaa_curso", "sigaa_rl_curso_unidade",
+    "sigaa_curriculo", "sigaa_rl_curriculo_curso",
+)
+
+ROLLUP_TABLE = loader.Table(
+    "sigaa_mv_aluno_rollup",
+    ("agrupamento", "curso", "unidade", "periodo_letivo_registro", "total"),
+    ("agrupamento", "curso", "unidade", "periodo_letivo_registro"),
+)
+
+
+def unaccent(value: Optional[str]) -> Optional[str]:
+    """Remove acentos (equivalente ao `unaccent` do Postgres para o português)."""
+    if value is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+# ---------------------------------------------------------------------------
+# Tradução das consultas
+# ---------------------------------------------------------------------------
+_TRANSLATIONS: Tuple[Tuple[str, str], ...] = (
+    (r"unaccent\((\w+)\.NOME\) ilike", r"\1.NOME_UNACCENT like"),
+    (r"substring\(([^()\s]+) from (\d+) for (\d+)\)", r"substr(\1, \2, \3)"),
+    (r"substring\(([^()\s]+) from (\d+)\)", r"substr(\1, \2)"),
+    (r"offset (:\w+)\s+limit (:\w+)", r"limit \2 offset \1"),
+    (r"\bpublic\.", ""),
+)
+
+
+def _lower_identifiers(sql: str) -> str:
+    # O Postgres devolve os nomes de coluna em minúsculas e as rotas dependem
+    # disso; o SQLite preserva a grafia da consulta. Literais entre aspas e
+    # parâmetros (:nome) são mantidos.
+    parts = re.split(r"('(?:[^']|'')*')", sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r"(?<![:\w])[A-Za-z_]\w*", lambda m: m.group(0).lower(), parts[i])
+    return "".join(parts)
+
+
+def translate(sql: str) -> str:
+    """Traduz uma consulta de `queries.py` para o SQLite."""
+    for pattern, replacement in _TRANSLATIONS:
+        sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
+    return _lower_identifiers(sql)
+
+
+def translate_queries(module: Any) -> SimpleNamespace:
+    """Devolve um objeto com as mesmas constantes de `module`, traduzidas."""
+    return SimpleNamespace(**{
+        name: translate(sql) for name, sql in vars(module).items()
+        if name.isupper() and isinstance(sql, str)
+    })
+
+
+# ---------------------------------------------------------------------------
+# Exportação
+# ---------------------------------------------------------------------------
+def _to_sqlite(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Mesmo formato de `to_utc_iso` (fastapi_app): comparável como texto
+        return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _source_columns(table: loader.Table) -> List[str]:
+    # Colunas lidas da origem; as tabelas do loader ganham MODIFICADO_EM
+    # (sql/SIGAA-Changes.sql), usada pelo filtro `modifiedSince`
+    if table in loader.TABLES:
+        return [*table.columns, "modificado_em"]
+    return list(table.columns)
+
+
+def _columns(table: loader.Table) -> List[str]:
+    columns = _source_columns(table)
+    if table.name in SEARCH_TABLES:
+        columns.append("nome_unaccent")
+    return columns
+
+
+def write_snapshot(path: str, sources: Iterable[Tuple[loader.Table, Iterable[Sequence[Any]]]]) -> dict:
+    """Grava as tabelas de `sources` em `path`, substituindo-o atomicamente.
+
+    `sources` produz pares (tabela, linhas) com as colunas de `table.columns`
+    (seguidas de ``modificado_em`` nas tabelas de `loader.TABLES`).
+    Retorna o número de linhas por tabela.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    counts = {}
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("pragma journal_mode = off")
+        conn.execute("pragma synchronous = off")
+        written = []
+        for table, rows in sources:
+            columns = _columns(table)
+            conn.execute(
+                f"create table {table.name} ({', '.join(columns)}, "
+                f"primary key ({', '.join(table.key)}))"
+            )
+            insert = (
+                f"insert into {table.name} ({', '.join(columns)}) "
+                f"values ({', '.join('?' for _ in columns)})"
+            )
+            nome = table.columns.index("nome") if table.name in SEARCH_TABLES else None
+            counts[table.name] = 0
+            batch = []
+            for row in rows:
+                values = [_to_sqlite(v) for v in row]
+                if nome is not None:
+                    values.append(unaccent(values[nome]))
+                batch.append(values)
+                if len(batch) >= _BATCH_SIZE:
+                    conn.executemany(insert, batch)
+                    counts[table.name] += len(batch)
+                    batch = []
+            conn.executemany(insert, batch)
+            counts[table.name] += len(batch)
+            written.append(table.name)
+        for index, table_name, columns in loader.INDEXES:
+            if table_name in written:
+                conn.execute(f"create index {index} on {table_name} ({columns})")
+        for table_name in MODIFIED_TABLES:
+            if table_name in written:
+                conn.execute(f"create index ix_{table_name}_modificado_em on {table_name} (modificado_em)")
+        conn.commit()
+        conn.execute("analyze")
+        conn.execute("pragma journal_mode = delete")
+    finally:
+        conn.close()
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return counts
+
+
+def _postgres_sources(conn) -> Iterator[Tuple[loader.Table, Iterable[Sequence[Any]]]]:
+    tables = list(loader.TABLES)
+    if conn.execute(text("select to_regclass('sigaa_mv_aluno_rollup')")).scalar() is not None:
+        tables.append(ROLLUP_TABLE)
+    # MODIFICADO_EM é opcional na origem (sql/SIGAA-Changes.sql); ausente, vai nula
+    modified = set(conn.execute(text(
+        "select table_name from information_schema.columns "
+        "where table_schema = current_schema() and column_name = 'modificado_em'"
+    )).scalars())
+    for table in tables:
+        columns = [
+            "null" if c == "modificado_em" and table.name not in modified else c
+            for c in _source_columns(table)
+        ]
+        result = conn.execution_options(stream_results=True, yield_per=_BATCH_SIZE).execute(
+            text(f"select {', '.join(columns)} from {table.name}")
+        )
+        yield table, result
+
+
+def export(pg_engine: Engine, path: str) -> dict:
+    """Exporta um snapshot consistente do Postgres para `path`."""
+    with pg_engine.connect().execution_options(
+        isolation_level="REPEATABLE READ", postgresql_readonly=True
+    ) as conn:
+        with conn.begin():
+            return write_snapshot(path, _postgres_sources(conn))
+
+
+# ---------------------------------------------------------------------------
+# Backend de leitura
+# ---------------------------------------------------------------------------
+def has_table(conn: Any, name: str) -> bool:
+    """Indica se o snapshot contém a tabela (o rollup é opcional na exportação)."""
+    return conn.execute(
+        text("select 1 from sqlite_master where type = 'table' and name = :name"), {"name": name}
+    ).first() is not None
+
+
+def _file_id(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns
+
+
+class SnapshotConnection(sqlite3.Connection):
+    """Conexão SQLite que lembra qual versão do arquivo abriu."""
+
+    file_id: Tuple[int, int] = (0, 0)
+
+
+def create_engine(path: str) -> Engine:
+    """Engine somente leitura sobre o snapshot, com troca a quente do arquivo."""
+    def connect() -> sqlite3.Connection:
+        # O id é lido antes de abrir: se o arquivo for trocado no meio, a
+        # próxima checagem reabre a conexão (nunca fica presa no antigo).
+        file_id = _file_id(path)
+        conn = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False,
+            factory=SnapshotConnection,
+        )
+        conn.file_id = file_id
+        conn.execute(f"pragma mmap_size = {SNAPSHOT_MMAP_SIZE}")
+        conn.execute("pragma query_only = 1")
+        conn.create_function("unaccent", 1, unaccent, deterministic=True)
+        return conn
+
+    engine = sa_create_engine(
+        "sqlite://", creator=connect, poolclass=SingletonThreadPool, pool_size=SNAPSHOT_POOL_SIZE
+    )
+
+    @event.listens_for(engine, "checkout")
+    def _reopen_if_swapped(dbapi_conn, connection_record, connection_proxy):
+        if dbapi_conn.file_id != _file_id(path):
+            raise DisconnectionError("snapshot substituído")
+
+    return engine
+
+
+def prewarm(path: str, chunk_size: int = 1024 * 1024) -> int:
+    """Lê o snapshot inteiro para o cache de páginas do SO; retorna os bytes lidos.
+
+    As conexões usam o arquivo via mmap, então as primeiras consultas não
+    precisam esperar pelo disco.
+    """
+    total = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            total += len(chunk)
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Linha de comando
+# ---------------------------------------------------------------------------
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Snapshot SQLite do banco SIGAA.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_parser = sub.add_parser("export", help="exporta o Postgres para um arquivo SQLite")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--database-url", default=loader.DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = export(sa_create_engine(args.database_url), args.path)
+    for table, count in counts.items():
+        print(f"{table:<34}{count:>10}")
+    print(f"snapshot gravado em {args.path} ({time.perf_counter() - start:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
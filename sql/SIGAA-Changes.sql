@@ -0,0 +1,213 @@
+--------------------------------------------------------
+--  Rastreamento de alterações (feed /_changes)
+--------------------------------------------------------
+-- Connect to SIGAA database
+\c SIGAA
+
+--------------------------------------------------------
+--  Coluna MODIFICADO_EM em todas as tabelas SIGAA
+--
+--  Preenchida por default na inserção e atualizada pela
+--  trigger SIGAA_TOUCH quando o conteúdo da linha muda
+--  (UPDATEs que não alteram nada mantêm a data).
+--------------------------------------------------------
+CREATE OR REPLACE FUNCTION SIGAA_TOUCH() RETURNS trigger AS $$
+BEGIN
+    NEW.MODIFICADO_EM := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'SIGAA_UNIDADE', 'SIGAA_DISCIPLINA', 'SIGAA_PREREQ', 'SIGAA_CURSO',
+        'SIGAA_RL_CURSO_UNIDADE', 'SIGAA_CURRICULO', 'SIGAA_RL_CURRICULO_CURSO',
+        'SIGAA_RL_CURRICULO_DISCIPLINA', 'SIGAA_TURMA_HORARIOAULA', 'SIGAA_TURMA',
+        'SIGAA_RL_TURMA_HORARIOAULA', 'SIGAA_ALUNO', 'SIGAA_RL_ALUNO_CURSO',
+        'SIGAA_RL_ALUNO_CURSO_DISCIPLINA', 'SIGAA_MATRICULA_STATUS', 'SIGAA_MATRICULA',
+        'SIGAA_MATRICULA_HISTORICO'
+    ]
+    LOOP
+        EXECUTE format('ALTER TABLE %s ADD COLUMN MODIFICADO_EM timestamp with time zone DEFAULT now()', t);
+        EXECUTE format('CREATE TRIGGER TR_%s_TOUCH BEFORE UPDATE ON %s '
+                       'FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) '
+                       'EXECUTE FUNCTION SIGAA_TOUCH()', t, t);
+    END LOOP;
+END;
+$$;
+
+-- Filtro modifiedSince das listagens (ver queries.py)
+CREATE INDEX IX_SIGAA_ALUNO_MODIFICADO_EM ON SIGAA_ALUNO (MODIFICADO_EM);
+CREATE INDEX IX_SIGAA_RL_ALUNO_CURSO_MODIFICADO_EM ON SIGAA_RL_ALUNO_CURSO (MODIFICADO_EM);
+CREATE INDEX IX_SIGAA_CURSO_MODIFICADO_EM ON SIGAA_CURSO (MODIFICADO_EM);
+CREATE INDEX IX_SIGAA_RL_CURSO_UNIDADE_MODIFICADO_EM ON SIGAA_RL_CURSO_UNIDADE (MODIFICADO_EM);
+CREATE INDEX IX_SIGAA_CURRICULO_MODIFICADO_EM ON SIGAA_CURRICULO (MODIFICADO_EM);
+CREATE INDEX IX_SIGAA_RL_CURRICULO_CURSO_MODIFICADO_EM ON SIGAA_RL_CURRICULO_CURSO (MODIFICADO_EM);
+
+--------------------------------------------------------
+--  DDL for Table SIGAA_CHANGE_LOG
+--
+--  Um registro por recurso da API (Aluno, Curso,
+--  Curriculo) afetado por um comando. TXID permite ler o
+--  log na ordem das transações sem lacunas: só são lidos
+--  registros de transações já encerradas.
+--------------------------------------------------------
+CREATE TABLE SIGAA_CHANGE_LOG
+(
+    SEQ bigserial,
+    TXID bigint NOT NULL DEFAULT txid_current(),
+    RECURSO character varying(20) NOT NULL,
+    RECURSO_ID character varying(20) NOT NULL,
+    OPERACAO character varying(1) NOT NULL,
+    DATA_HORA timestamp with time zone NOT NULL DEFAULT now(),
+    PRIMARY KEY (SEQ)
+);
+
+CREATE INDEX IX_SIGAA_CHANGE_LOG_TXID ON SIGAA_CHANGE_LOG (TXID, SEQ);
+
+--------------------------------------------------------
+--  DDL for Table SIGAA_CHANGE_LOG_HORIZON
+--
+--  Posição (TXID, SEQ) até a qual o log foi descartado
+--  (retenção ou carga inicial sem log). Continuações
+--  anteriores a ela recebem 410 em /_changes.
+--------------------------------------------------------
+CREATE TABLE SIGAA_CHANGE_LOG_HORIZON
+(
+    TXID bigint NOT NULL,
+    SEQ bigint NOT NULL
+);
+
+INSERT INTO SIGAA_CHANGE_LOG_HORIZON (TXID, SEQ) VALUES (0, 0);
+
+--------------------------------------------------------
+--  Trigger de comando (FOR EACH STATEMENT) com tabelas
+--  de transição: um único INSERT no log por comando, com
+--  os recursos distintos afetados.
+--
+--  Argumentos:
+--    TG_ARGV[0]: recurso (Aluno, Curso, Curriculo)
+--    TG_ARGV[1]: consulta que devolve os ids dos recursos
+--                a partir das linhas em %1$s
+--    TG_ARGV[2]: 'true' se remover a linha remove o
+--                recurso (OPERACAO 'D'); senão 'U'
+--
+--  Comandos com "SET LOCAL sigaa.change_log = 'off'"
+--  não são registrados (carga inicial do loader.py).
+--------------------------------------------------------
+CREATE OR REPLACE FUNCTION SIGAA_LOG_CHANGES() RETURNS trigger AS $$
+DECLARE
+    linhas text;
+    op character varying(1) := 'U';
+BEGIN
+    IF current_setting('sigaa.change_log', true) = 'off' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        linhas := 'new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        linhas := 'old_rows';
+        IF TG_ARGV[2]::boolean THEN
+            op := 'D';
+        END IF;
+    ELSE
+        -- Versões antigas e novas das linhas que mudaram: uma linha que
+        -- trocou de dono (ex.: aluno/curso) afeta os dois recursos
+        linhas := '((select * from new_rows except select * from old_rows) '
+                  'union all (select * from old_rows except select * from new_rows))';
+    END IF;
+    EXECUTE format(
+        'INSERT INTO SIGAA_CHANGE_LOG (RECURSO, RECURSO_ID, OPERACAO) '
+        'SELECT DISTINCT %L, ids.id, %L FROM (%s) ids (id) WHERE ids.id IS NOT NULL',
+        TG_ARGV[0], op, format(TG_ARGV[1], linhas)
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    r record;
+BEGIN
+    FOR r IN SELECT * FROM (VALUES
+        ('SIGAA_ALUNO', 'Aluno', 'select r.MATRICULA from %1$s r', true),
+        ('SIGAA_RL_ALUNO_CURSO', 'Aluno', 'select r.ALUNO from %1$s r', false),
+        ('SIGAA_CURSO', 'Curso', 'select r.ID from %1$s r', true),
+        ('SIGAA_RL_CURSO_UNIDADE', 'Curso', 'select r.CURSO from %1$s r', false),
+        ('SIGAA_UNIDADE', 'Curso',
+         'select cu.CURSO from %1$s r join SIGAA_RL_CURSO_UNIDADE cu on cu.UNIDADE = r.ID', false),
+        ('SIGAA_CURRICULO', 'Curriculo',
+         'select substring(r.ID from 1 for 4)||''.''||substring(r.ID from 6) from %1$s r', true),
+        ('SIGAA_RL_CURRICULO_CURSO', 'Curriculo',
+         'select substring(r.CURRICULO from 1 for 4)||''.''||substring(r.CURRICULO from 6) from %1$s r', false),
+        ('SIGAA_RL_CURRICULO_DISCIPLINA', 'Curriculo',
+         'select substring(r.CURRICULO from 1 for 4)||''.''||substring(r.CURRICULO from 6) from %1$s r', false),
+        ('SIGAA_DISCIPLINA', 'Curriculo',
+         'select substring(cd.CURRICULO from 1 for 4)||''.''||substring(cd.CURRICULO from 6) '
+         'from %1$s r join SIGAA_RL_CURRICULO_DISCIPLINA cd on cd.DISCIPLINA = r.ID', false)
+    ) AS v (tabela, recurso, consulta, remove)
+    LOOP
+        -- Tabelas de transição exigem uma trigger por evento
+        EXECUTE format('CREATE TRIGGER TR_%s_CHANGES_INS AFTER INSERT ON %s '
+                       'REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION SIGAA_LOG_CHANGES(%L, %L, %L)',
+                       r.tabela, r.tabela, r.recurso, r.consulta, r.remove);
+        EXECUTE format('CREATE TRIGGER TR_%s_CHANGES_UPD AFTER UPDATE ON %s '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION SIGAA_LOG_CHANGES(%L, %L, %L)',
+                       r.tabela, r.tabela, r.recurso, r.consulta, r.remove);
+        EXECUTE format('CREATE TRIGGER TR_%s_CHANGES_DEL AFTER DELETE ON %s '
+                       'REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION SIGAA_LOG_CHANGES(%L, %L, %L)',
+                       r.tabela, r.tabela, r.recurso, r.consulta, r.remove);
+    END LOOP;
+END;
+$$;
+
+--------------------------------------------------------
+--  Retenção: descarta os registros anteriores a
+--  `retencao` e avança o horizonte (ver changelog.py).
+--  Retorna o número de registros removidos.
+--------------------------------------------------------
+CREATE OR REPLACE FUNCTION SIGAA_PRUNE_CHANGE_LOG(retencao interval) RETURNS bigint AS $$
+DECLARE
+    limite record;
+    removidos bigint;
+BEGIN
+    -- Corta numa posição (TXID, SEQ) para não deixar lacunas na ordem de leitura
+    SELECT cl.TXID, cl.SEQ INTO limite FROM SIGAA_CHANGE_LOG cl
+    WHERE cl.DATA_HORA < now() - retencao
+    ORDER BY cl.TXID DESC, cl.SEQ DESC
+    LIMIT 1;
+    IF NOT FOUND THEN
+        RETURN 0;
+    END IF;
+    DELETE FROM SIGAA_CHANGE_LOG cl WHERE (cl.TXID, cl.SEQ) <= (limite.TXID, limite.SEQ);
+    GET DIAGNOSTICS removidos = ROW_COUNT;
+    UPDATE SIGAA_CHANGE_LOG_HORIZON SET TXID = limite.TXID, SEQ = limite.SEQ
+    WHERE (TXID, SEQ) < (limite.TXID, limite.SEQ);
+    RETURN removidos;
+END;
+$$ LANGUAGE plpgsql;
+
+--------------------------------------------------------
+--  Descarta todo o log (carga inicial sem registro): as
+--  continuações existentes passam a exigir ressincronização
+--------------------------------------------------------
+CREATE OR REPLACE FUNCTION SIGAA_RESET_CHANGE_LOG() RETURNS void AS $$
+BEGIN
+    DELETE FROM SIGAA_CHANGE_LOG;
+    UPDATE SIGAA_CHANGE_LOG_HORIZON
+    SET TXID = txid_current(), SEQ = nextval(pg_get_serial_sequence('sigaa_change_log', 'seq'));
+END;
+$$ LANGUAGE plpgsql;
+
+--------------------------------------------------------
+--  Grant permissions to SIGAA user
+--------------------------------------------------------
+GRANT ALL PRIVILEGES ON SIGAA_CHANGE_LOG TO "SIGAA";
+GRANT ALL PRIVILEGES ON SIGAA_CHANGE_LOG_HORIZON TO "SIGAA";
+GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO "SIGAA";
@@ -0,0 +1,39 @@
+--------------------------------------------------------
+--  Pré-requisitos da carga (loader.py)
+--------------------------------------------------------
+-- Connect to SIGAA database
+\c SIGAA
+
+--------------------------------------------------------
+--  Tabelas SIGAA passam a pertencer ao usuário SIGAA
+--
+--  O loader.py conecta como SIGAA e precisa ser dono das
+--  tabelas para criar/remover os índices de apoio e
+--  executar ANALYZE (as sequências serial acompanham a
+--  tabela).
+--------------------------------------------------------
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOR t IN
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = 'public' AND tablename LIKE 'sigaa\_%' AND tableowner <> 'SIGAA'
+    LOOP
+        EXECUTE format('ALTER TABLE %I OWNER TO "SIGAA"', t);
+    END LOOP;
+END;
+$$;
+
+--------------------------------------------------------
+--  Índices de apoio às consultas de queries.py
+--  (mesmos de loader.INDEXES)
+--------------------------------------------------------
+CREATE INDEX IF NOT EXISTS ix_sigaa_disciplina_unidade ON SIGAA_DISCIPLINA (UNIDADE);
+CREATE INDEX IF NOT EXISTS ix_sigaa_rl_curso_unidade_unidade ON SIGAA_RL_CURSO_UNIDADE (UNIDADE);
+CREATE INDEX IF NOT EXISTS ix_sigaa_rl_curriculo_curso_curso ON SIGAA_RL_CURRICULO_CURSO (CURSO);
+CREATE INDEX IF NOT EXISTS ix_sigaa_rl_aluno_curso_aluno ON SIGAA_RL_ALUNO_CURSO (ALUNO);
+CREATE INDEX IF NOT EXISTS ix_sigaa_rl_aluno_curso_curso ON SIGAA_RL_ALUNO_CURSO (CURSO, PERIODO_LETIVO_REGISTRO);
+CREATE INDEX IF NOT EXISTS ix_sigaa_turma_disciplina ON SIGAA_TURMA (DISCIPLINA);
+CREATE INDEX IF NOT EXISTS ix_sigaa_matricula_aluno_curso ON SIGAA_MATRICULA (ALUNO_CURSO);
+CREATE INDEX IF NOT EXISTS ix_sigaa_matricula_turma ON SIGAA_MATRICULA (TURMA);
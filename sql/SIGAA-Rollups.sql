@@ -0,0 +1,54 @@
+--------------------------------------------------------
+--  Rollups de contagem de alunos
+--------------------------------------------------------
+-- Connect to SIGAA database
+\c SIGAA
+
+--------------------------------------------------------
+--  Materialized view SIGAA_MV_ALUNO_ROLLUP
+--
+--  Alunos distintos por curso, unidade e período letivo
+--  de ingresso, em todas as combinações (cube). A coluna
+--  AGRUPAMENTO é o bitmask de GROUPING(CURSO, UNIDADE,
+--  PERIODO_LETIVO_REGISTRO): bit ligado = dimensão
+--  agregada (valor '' na linha).
+--------------------------------------------------------
+CREATE MATERIALIZED VIEW SIGAA_MV_ALUNO_ROLLUP AS
+select
+    grouping(ac.CURSO, cu.UNIDADE, ac.PERIODO_LETIVO_REGISTRO) as AGRUPAMENTO,
+    coalesce(ac.CURSO, '') as CURSO,
+    coalesce(cu.UNIDADE, '') as UNIDADE,
+    coalesce(ac.PERIODO_LETIVO_REGISTRO, '') as PERIODO_LETIVO_REGISTRO,
+    count(distinct ac.ALUNO) as TOTAL
+from SIGAA_RL_ALUNO_CURSO ac
+left join SIGAA_RL_CURSO_UNIDADE cu ON ac.CURSO = cu.CURSO
+group by cube (ac.CURSO, cu.UNIDADE, ac.PERIODO_LETIVO_REGISTRO);
+
+-- Necessário para REFRESH ... CONCURRENTLY e usado por todas as leituras
+CREATE UNIQUE INDEX PK_SIGAA_MV_ALUNO_ROLLUP
+    ON SIGAA_MV_ALUNO_ROLLUP (AGRUPAMENTO, CURSO, UNIDADE, PERIODO_LETIVO_REGISTRO);
+
+-- Apenas o dono pode executar REFRESH
+ALTER MATERIALIZED VIEW SIGAA_MV_ALUNO_ROLLUP OWNER TO "SIGAA";
+
+--------------------------------------------------------
+--  Notificação de mudança nas tabelas de origem
+--
+--  O refresh é feito fora da transação de escrita pelo
+--  processo da API (ver rollups.py), que escuta o canal
+--  sigaa_rollups.
+--------------------------------------------------------
+CREATE OR REPLACE FUNCTION SIGAA_NOTIFY_ROLLUPS() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('sigaa_rollups', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER TR_SIGAA_RL_ALUNO_CURSO_ROLLUPS
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SIGAA_RL_ALUNO_CURSO
+    FOR EACH STATEMENT EXECUTE FUNCTION SIGAA_NOTIFY_ROLLUPS();
+
+CREATE TRIGGER TR_SIGAA_RL_CURSO_UNIDADE_ROLLUPS
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON SIGAA_RL_CURSO_UNIDADE
+    FOR EACH STATEMENT EXECUTE FUNCTION SIGAA_NOTIFY_ROLLUPS();
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from coalescing import SingleFlight, make_key
+
+
+def test_make_key_ignores_order_and_none():
+    assert make_key("/Aluno", {"a": 1, "b": 2, "c": None}) == make_key("/Aluno", {"b": 2, "a": 1})
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        sf = SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(sf.do("k", fn) for _ in range(5)))
+        return sf, calls, results
+
+    sf, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [1] * 5
+    assert sf.stats()["coalesced"] == 4
+    assert sf.stats()["inflight"] == 0
+
+
+def test_error_propagates_to_all_waiters():
+    async def scenario():
+        sf = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("falhou")
+
+        results = await asyncio.gather(*(sf.do("k", fn) for _ in range(3)), return_exceptions=True)
+        return sf, results
+
+    sf, results = asyncio.run(scenario())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert sf.stats()["errors"] == 1
+    assert sf.stats()["inflight"] == 0
+
+
+def test_execution_survives_while_other_waiters_remain():
+    async def scenario():
+        sf = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.05)
+            return "ok"
+
+        a = asyncio.ensure_future(sf.do("k", fn))
+        b = asyncio.ensure_future(sf.do("k", fn))
+        await asyncio.sleep(0.01)
+        a.cancel()
+        return await b, sf
+
+    result, sf = asyncio.run(scenario())
+    assert result == "ok"
+    assert sf.stats()["cancelled"] == 0
+
+
+def test_last_waiter_cancels_execution():
+    async def scenario():
+        sf = SingleFlight()
+        started = asyncio.Event()
+
+        async def fn():
+            started.set()
+            await asyncio.sleep(10)
+
+        a = asyncio.ensure_future(sf.do("k", fn))
+        await started.wait()
+        a.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await a
+        await asyncio.sleep(0)
+        return sf
+
+    sf = asyncio.run(scenario())
+    assert sf.stats()["cancelled"] == 1
+    assert sf.stats()["inflight"] == 0
+
+
+def test_call_after_cancellation_starts_new_execution():
+    async def scenario():
+        sf = SingleFlight()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+
+        async def fast():
+            return "novo"
+
+        a = asyncio.ensure_future(sf.do("k", slow))
+        await started.wait()
+        a.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await a
+        # Chega antes do callback que remove a execução cancelada
+        return await sf.do("k", fast), sf
+
+    result, sf = asyncio.run(scenario())
+    assert result == "novo"
+    assert sf.stats()["executions"] == 2
@@ -0,0 +1,41 @@
+import pytest
+
+import deadlines
+
+
+class FakeDriverConnection:
+    def __init__(self):
+        self.cancels = 0
+
+    def cancel(self):
+        self.cancels += 1
+
+
+def test_cancel_reaches_attached_connection():
+    canceller = deadlines.Canceller()
+    conn = FakeDriverConnection()
+    canceller.attach(conn)
+    canceller.cancel()
+    assert canceller.cancelled
+    assert conn.cancels == 1
+
+
+def test_cancel_after_detach_does_not_touch_connection():
+    canceller = deadlines.Canceller()
+    conn = FakeDriverConnection()
+    canceller.attach(conn)
+    canceller.detach()
+    canceller.cancel()
+    assert conn.cancels == 0
+
+
+def test_attach_after_cancel_raises_instead_of_running_query():
+    canceller = deadlines.Canceller()
+    conn = FakeDriverConnection()
+    canceller.cancel()
+    with pytest.raises(deadlines.QueryCancelled):
+        canceller.attach(conn)
+    # Conexão ociosa: cancel() não teria efeito e a consulta rodaria inteira
+    assert conn.cancels == 0
+    canceller.cancel()
+    assert conn.cancels == 0
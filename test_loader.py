@@ -0,0 +1,146 @@
+import csv
+import json
+
+import pytest
+
+import loader
+
+CURSO = next(t for t in loader.TABLES if t.name == "sigaa_curso")
+PREREQ = next(t for t in loader.TABLES if t.name == "sigaa_prereq")
+
+
+# ---------------------------------------------------------------------------
+# Staging e mesclagem
+# ---------------------------------------------------------------------------
+def test_staging_does_not_copy_constraints():
+    sql = loader.staging_sql(CURSO, ["id", "nome"])
+    assert sql == (
+        "create temp table stg_sigaa_curso on commit drop as "
+        "select id, nome from sigaa_curso with no data"
+    )
+    assert " like " not in sql
+
+
+def test_full_extract_is_a_single_upsert():
+    statements = loader.merge_sql(CURSO, list(CURSO.columns))
+    assert len(statements) == 1
+    sql = statements[0]
+    assert sql.startswith("insert into sigaa_curso as t (id, nome, grau_academico,")
+    assert "select distinct on (id) " in sql
+    assert "on conflict (id) do update set nome = excluded.nome," in sql
+    assert "is distinct from (excluded.nome," in sql
+
+
+def test_full_extract_of_key_only_table_does_nothing_on_conflict():
+    (sql,) = loader.merge_sql(PREREQ, list(PREREQ.columns))
+    assert sql.endswith("on conflict (disciplina_requer, disciplina_requerido) do nothing")
+
+
+def test_partial_extract_updates_then_inserts_new_keys():
+    # Curso 6351 existente com apenas id,nome: o INSERT ... ON CONFLICT
+    # falharia no NOT NULL de grau_academico antes de resolver o conflito
+    update, insert = loader.merge_sql(CURSO, ["id", "nome"])
+    assert update == (
+        "update sigaa_curso as t set nome = s.nome "
+        "from (select distinct on (id) id, nome from stg_sigaa_curso s order by id) s "
+        "where t.id = s.id and (t.nome) is distinct from (s.nome)"
+    )
+    assert insert == (
+        "insert into sigaa_curso (id, nome) "
+        "select distinct on (id) id, nome from stg_sigaa_curso s "
+        "where not exists (select 1 from sigaa_curso t where t.id = s.id) order by id"
+    )
+    assert "on conflict" not in update + insert
+
+
+def test_partial_extract_with_only_key_inserts_new_keys():
+    (insert,) = loader.merge_sql(CURSO, ["id"])
+    assert insert.startswith("insert into sigaa_curso (id) ")
+    assert "where not exists" in insert
+
+
+def test_column_order_does_not_make_extract_partial():
+    columns = list(reversed(CURSO.columns))
+    (sql,) = loader.merge_sql(CURSO, columns)
+    assert "on conflict (id)" in sql
+
+
+class FakeCursor:
+    def __init__(self, rowcounts):
+        self.executed = []
+        self.rowcounts = list(rowcounts)
+        self.rowcount = -1
+
+    def execute(self, sql):
+        self.executed.append(sql)
+        self.rowcount = self.rowcounts.pop(0) if self.rowcounts else -1
+
+    def copy_expert(self, sql, f):
+        self.executed.append(sql)
+        self.rowcount = sum(1 for _ in f)
+
+
+def test_load_table_sums_rowcounts_of_partial_merge(tmp_path):
+    path = tmp_path / "sigaa_curso.csv"
+    path.write_text("ID,Nome\n6351,Novo nome\n9999,Outro\n", encoding="utf-8")
+    cur = FakeCursor([0, 1, 1])
+
+    result = loader.load_table(cur, CURSO, str(path))
+
+    assert cur.executed[0] == loader.staging_sql(CURSO, ["id", "nome"])
+    assert cur.executed[1] == "copy stg_sigaa_curso (id, nome) from stdin with (format csv)"
+    assert cur.executed[2:] == loader.merge_sql(CURSO, ["id", "nome"])
+    assert (result.table, result.staged, result.merged) == ("sigaa_curso", 2, 2)
+
+
+# ---------------------------------------------------------------------------
+# Leitura das extrações
+# ---------------------------------------------------------------------------
+def test_open_csv_normalizes_header(tmp_path):
+    path = tmp_path / "sigaa_curso.csv"
+    path.write_text("\ufeffID, Nome\n6351,Computação\n", encoding="utf-8")
+    columns, f = loader.open_csv(str(path), CURSO)
+    with f:
+        assert columns == ["id", "nome"]
+        assert f.read() == "6351,Computação\n"
+
+
+@pytest.mark.parametrize("header, message", [
+    ("id,nome,sigla\n", "colunas desconhecidas para sigaa_curso: sigla"),
+    ("nome,turno\n", "colunas da chave ausentes: id"),
+])
+def test_open_csv_rejects_invalid_columns(tmp_path, header, message):
+    path = tmp_path / "sigaa_curso.csv"
+    path.write_text(header, encoding="utf-8")
+    with pytest.raises(loader.LoadError, match=message):
+        loader.open_csv(str(path), CURSO)
+
+
+def test_ndjson_to_csv_uses_table_column_order(tmp_path):
+    path = tmp_path / "sigaa_curso.ndjson"
+    records = [
+        {"TURNO": "M", "ID": 1, "NOME": "A, B"},
+        {},
+        {"ID": 2, "NOME": None, "TURNO": "N"},
+    ]
+    path.write_text("\n".join(json.dumps(r) if r else "" for r in records) + "\n", encoding="utf-8")
+
+    columns, f = loader.ndjson_to_csv(str(path), CURSO)
+    with f:
+        rows = list(csv.reader(f))
+    assert columns == ["id", "nome", "turno"]
+    assert rows == [["1", "A, B", "M"], ["2", "", "N"]]
+
+
+def test_ndjson_to_csv_rejects_missing_key(tmp_path):
+    path = tmp_path / "sigaa_curso.ndjson"
+    path.write_text(json.dumps({"nome": "A"}) + "\n", encoding="utf-8")
+    with pytest.raises(loader.LoadError, match="colunas da chave ausentes: id"):
+        loader.ndjson_to_csv(str(path), CURSO)
+
+
+def test_find_extract_prefers_csv(tmp_path):
+    (tmp_path / "sigaa_curso.ndjson").write_text("", encoding="utf-8")
+    assert loader.find_extract(str(tmp_path), CURSO).endswith("sigaa_curso.ndjson")
+    (tmp_path / "sigaa_curso.csv").write_text("id\n", encoding="utf-8")
+    assert loader.find_extract(str(tmp_path), CURSO).endswith("sigaa_curso.csv")
@@ -0,0 +1,193 @@
+import itertools
+
+import pytest
+
+import fastapi_app
+import rollups
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+
+
+class FakeDriverConnection:
+    def __init__(self):
+        self.autocommit = False
+        self.executed = []
+        self.notifies = []
+        self.polls = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def poll(self):
+        # Uma notificação chega na primeira espera
+        self.polls += 1
+        if self.polls == 1:
+            self.notifies.append(object())
+
+
+class FakePoolConnection:
+    """Imita o _ConnectionFairy do SQLAlchemy: sem driver após o detach."""
+
+    def __init__(self):
+        self._driver = FakeDriverConnection()
+        self.detached = False
+        self.closed = False
+
+    @property
+    def driver_connection(self):
+        return None if self.detached else self._driver
+
+    def detach(self):
+        self.detached = True
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEngine:
+    def __init__(self):
+        self.raw = FakePoolConnection()
+
+    def raw_connection(self):
+        return self.raw
+
+
+def test_listen_refreshes_on_notification(monkeypatch):
+    engine = FakeEngine()
+    refresher = rollups.RollupRefresher(engine, interval=3600, min_interval=0)
+
+    def fake_refresh(e):
+        assert e is engine
+        refresher.stop()
+        return True
+
+    monkeypatch.setattr(rollups.select, "select", lambda *args: ([], [], []))
+    monkeypatch.setattr(rollups, "refresh", fake_refresh)
+
+    refresher._listen()
+
+    driver = engine.raw._driver
+    assert driver.autocommit is True
+    assert driver.executed == [f"listen {rollups.CHANNEL}"]
+    assert refresher.stats()["refreshes"] == 1
+    assert refresher.stats()["lastRefresh"] is not None
+    assert engine.raw.detached and engine.raw.closed
+
+
+def test_listen_skips_count_when_another_process_refreshes(monkeypatch):
+    engine = FakeEngine()
+    refresher = rollups.RollupRefresher(engine, interval=3600, min_interval=0)
+
+    def locked_elsewhere(e):
+        refresher.stop()
+        return False
+
+    monkeypatch.setattr(rollups.select, "select", lambda *args: ([], [], []))
+    monkeypatch.setattr(rollups, "refresh", locked_elsewhere)
+
+    refresher._listen()
+
+    assert refresher.stats()["refreshes"] == 0
+
+
+# ---------------------------------------------------------------------------
+# Bitmask AGRUPAMENTO de /_stats (GROUPING(CURSO, UNIDADE, PERIODO_LETIVO_REGISTRO))
+# ---------------------------------------------------------------------------
+CURSO, UNIDADE, PERIODO = 4, 2, 1
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.params = None
+
+    def execute(self, statement, params):
+        self.params = params
+        return FakeResult(self.rows)
+
+
+def expected_agrupamento(curso, unidade, periodo, group_by):
+    # Bit ligado = dimensão agregada: nem filtrada nem pedida em groupBy
+    mask = 0
+    if curso is None and "curso" not in group_by:
+        mask |= CURSO
+    if unidade is None and "unidade" not in group_by:
+        mask |= UNIDADE
+    if periodo is None and "periodoIngresso" not in group_by:
+        mask |= PERIODO
+    return mask
+
+
+CASES = [
+    # (curso, unidade, periodoIngresso, groupBy, agrupamento)
+    (None, None, None, [], CURSO | UNIDADE | PERIODO),
+    ("6351", None, None, [], UNIDADE | PERIODO),
+    (None, "123", None, [], CURSO | PERIODO),
+    (None, None, "20231", [], CURSO | UNIDADE),
+    ("6351", "123", "20231", [], 0),
+    (None, None, None, ["curso"], UNIDADE | PERIODO),
+    (None, None, None, ["unidade"], CURSO | PERIODO),
+    (None, None, None, ["periodoIngresso"], CURSO | UNIDADE),
+    (None, None, None, ["curso", "unidade", "periodoIngresso"], 0),
+    ("6351", None, None, ["periodoIngresso"], UNIDADE),
+    (None, "123", None, ["curso"], PERIODO),
+]
+
+
+@pytest.mark.parametrize("curso, unidade, periodo, group_by, agrupamento", CASES)
+def test_agrupamento(curso, unidade, periodo, group_by, agrupamento):
+    db = FakeSession()
+    fastapi_app.build_stats(db, curso, unidade, periodo, group_by)
+    assert db.params["agrupamento"] == agrupamento
+
+
+def test_agrupamento_all_combinations():
+    dimensions = list(fastapi_app.STATS_DIMENSIONS)
+    for curso, unidade, periodo in itertools.product([None, "x"], repeat=3):
+        for n in range(len(dimensions) + 1):
+            for group_by in itertools.combinations(dimensions, n):
+                db = FakeSession()
+                fastapi_app.build_stats(db, curso, unidade, periodo, list(group_by))
+                assert db.params["agrupamento"] == expected_agrupamento(curso, unidade, periodo, group_by)
+
+
+def test_open_dimensions_are_returned():
+    db = FakeSession([{
+        "curso": "6351", "unidade": "", "periodo_ingresso_ano": "2023",
+        "periodo_ingresso_numero": "1", "total": 7,
+    }])
+    result = fastapi_app.build_stats(db, None, None, None, ["curso", "periodoIngresso"])
+    assert db.params["agrupamento"] == UNIDADE
+    assert result == {
+        "groupBy": ["curso", "periodoIngresso"],
+        "values": [{"curso": "6351", "periodoIngresso": {"ano": 2023, "periodo": 1}, "total": 7}],
+    }
+
+
+def test_total_without_group_by():
+    db = FakeSession([{"curso": "", "unidade": "", "periodo_ingresso_ano": "",
+                       "periodo_ingresso_numero": "", "total": 20}])
+    assert fastapi_app.build_stats(db, None, None, None, []) == {"total": 20}
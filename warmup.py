@@ -0,0 +1,212 @@
+"""Aquecimento na inicialização e estado de prontidão da API.
+
+Antes de a API aceitar requisições (lifespan do FastAPI):
+
+1. as conexões mínimas do pool (``POOL_SIZE``) são abertas e validadas, de modo
+   que as primeiras requisições não pagam conexão TCP e autenticação;
+2. cada consulta de `queries.py` passa por ``EXPLAIN`` (``EXPLAIN QUERY PLAN``
+   no snapshot SQLite) com todos os parâmetros nulos, em cada conexão aberta.
+   Isso detecta divergências de esquema (tabela ou coluna ausente) antes do
+   primeiro cliente e carrega o catálogo em cada backend do Postgres;
+3. no backend de snapshot, o arquivo SQLite é lido por inteiro para o cache de
+   páginas do sistema operacional (índices e tabelas já em memória).
+
+`Readiness` guarda o resultado, exposto em ``/health/ready``.
+
+Para medir o tempo até a primeira requisição rápida, com e sem aquecimento:
+
+    python warmup.py bench
+    python warmup.py bench --no-warmup
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+# "strict": divergência de esquema impede a inicialização; "warn": apenas
+# registra; "off": sem aquecimento
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "strict")
+
+_EXPLAIN = {"postgresql": "explain ", "sqlite": "explain query plan "}
+
+
+class SchemaDriftError(RuntimeError):
+    """Consultas de `queries.py` incompatíveis com o esquema do banco."""
+
+    def __init__(self, failures: Dict[str, str]) -> None:
+        super().__init__("consultas inválidas: " + ", ".join(sorted(failures)))
+        self.failures = failures
+
+
+def dry_run(conn: Connection, statements: Dict[str, str]) -> Dict[str, str]:
+    """Executa ``EXPLAIN`` de cada consulta; retorna as falhas por nome."""
+    prefix = _EXPLAIN[conn.dialect.name]
+    failures = {}
+    for name, sql in statements.items():
+        statement = text(prefix + sql)
+        params = dict.fromkeys(statement.compile().params)
+        try:
+            with conn.begin():
+                deadlines.apply_timeout(conn, deadlines.DEFAULT_STATEMENT_TIMEOUT_MS)
+                conn.execute(statement, params).all()
+        except DBAPIError as exc:
+            failures[name] = str(exc.orig).strip()
+    return failures
+
+
+def prewarm_pool(engine: Engine, size: int, statements: Dict[str, str]) -> Dict[str, str]:
+    """Abre `size` conexões simultâneas, aquece cada uma e as devolve ao pool.
+
+    As falhas de `dry_run` são as da primeira conexão (o esquema é o mesmo em
+    todas).
+    """
+    conns: List[Connection] = []
+    try:
+        for _ in range(size):
+            conns.append(engine.connect())
+        failures = dry_run(conns[0], statements)
+        for conn in conns[1:]:
+            dry_run(conn, statements)
+        return failures
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+class Readiness:
+    """Estado da inicialização, consultado por ``/health/ready``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.ready = False
+        self.warmup_seconds: Optional[float] = None
+        self.pool_connections = 0
+        self.statements = 0
+        self.failures: Dict[str, str] = {}
+
+    def warm_up(self, engine: Engine, statements: Dict[str, str], pool_size: int,
+                mode: str = STARTUP_WARMUP, preload: Iterable[Any] = ()) -> None:
+        """Aquece pool e consultas conforme `mode`; levanta SchemaDriftError em "strict".
+
+        `preload` são funções sem argumentos executadas antes (ex.: leitura do
+        snapshot para o cache de páginas).
+        """
+        start = time.monotonic()
+        if mode != "off":
+            for fn in preload:
+                fn()
+            failures = prewarm_pool(engine, pool_size, statements)
+            for name, error in failures.items():
+                logger.error("consulta %s inválida: %s", name, error)
+            with self._lock:
+                self.pool_connections = pool_size
+                self.statements = len(statements)
+                self.failures = failures
+            if failures and mode == "strict":
+                raise SchemaDriftError(failures)
+        with self._lock:
+            self.warmup_seconds = time.monotonic() - start
+            self.ready = True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "warmupSeconds": self.warmup_seconds,
+                "poolConnections": self.pool_connections,
+                "statements": self.statements,
+                "failures": dict(self.failures),
+            }
+
+
+# ---------------------------------------------------------------------------
+# Benchmark: tempo até a primeira requisição rápida
+# ---------------------------------------------------------------------------
+def _get(url: str, timeout: float) -> Optional[float]:
+    """Duração de um GET bem-sucedido em segundos; None se falhar."""
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+    except (urllib.error.URLError, OSError):
+        return None
+    return time.perf_counter() - start
+
+
+def bench(path: str, port: int, fast_ms: float, warmup: bool, deadline: float) -> dict:
+    """Sobe a API em um subprocesso e mede, a partir do início do processo:
+
+    - ``firstResponse``: a primeira resposta bem-sucedida de `path`;
+    - ``firstFast``: a primeira resposta de `path` em até `fast_ms`.
+    """
+    env = dict(os.environ, STARTUP_WARMUP=STARTUP_WARMUP if warmup else "off")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fastapi_app:app", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}{path}"
+    result: Dict[str, Optional[float]] = {"firstResponse": None, "firstFast": None, "firstLatencyMs": None}
+    try:
+        while time.perf_counter() - start < deadline and server.poll() is None:
+            elapsed = _get(url, timeout=deadline)
+            if elapsed is None:
+                time.sleep(0.01)
+                continue
+            now = time.perf_counter() - start
+            if result["firstResponse"] is None:
+                result["firstResponse"] = now
+                result["firstLatencyMs"] = elapsed * 1000
+            if elapsed * 1000 <= fast_ms:
+                result["firstFast"] = now
+                break
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Aquecimento da API SIGAA.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench_parser = sub.add_parser("bench", help="mede o tempo até a primeira requisição rápida")
+    bench_parser.add_argument("--path", default="/Aluno?size=10")
+    bench_parser.add_argument("--port", type=int, default=8765)
+    bench_parser.add_argument("--fast-ms", type=float, default=50.0,
+                              help="latência máxima de uma requisição rápida (padrão: 50)")
+    bench_parser.add_argument("--runs", type=int, default=3)
+    bench_parser.add_argument("--no-warmup", action="store_true", help="sobe a API com STARTUP_WARMUP=off")
+    bench_parser.add_argument("--deadline", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    def fmt(value: Optional[float], spec: str) -> str:
+        return "-" if value is None else format(value, spec)
+
+    print(f"{'run':<5}{'primeira resposta (s)':>22}{'latência (ms)':>14}{'primeira rápida (s)':>21}")
+    failed = False
+    for run in range(1, args.runs + 1):
+        r = bench(args.path, args.port, args.fast_ms, not args.no_warmup, args.deadline)
+        failed = failed or r["firstFast"] is None
+        print(f"{run:<5}{fmt(r['firstResponse'], '.3f'):>22}{fmt(r['firstLatencyMs'], '.1f'):>14}"
+              f"{fmt(r['firstFast'], '.3f'):>21}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())